@@ -10,6 +10,8 @@ pub enum Command {
     Quit,
     // PING message
     Ping { message: Bytes },
+    // FLUSHALL
+    FlushAll,
     Unknown,
 }
 
@@ -22,34 +24,37 @@ const CRLF: &str = "\r\n";
 
 pub fn parse_command(command_line: Vec<String>) -> Result<Command, NotEnoughParametersError> {
     let command = command_line.get(0).unwrap();
-    if command.eq(&String::from("GET")) {
-        if let Some(key) = command_line.get(1) {
-            Ok(Command::Get {
-                key: key.to_string(),
-            })
-        } else {
-            debug!("not enough parameters for GET command");
-            let message = format!("-ERROR not enough parameters for GET{CRLF}");
-            Err(NotEnoughParametersError { message })
+    match command.as_str() {
+        "GET" => {
+            if let Some(key) = command_line.get(1) {
+                Ok(Command::Get {
+                    key: key.to_string(),
+                })
+            } else {
+                debug!("not enough parameters for GET command");
+                let message = format!("-ERROR not enough parameters for GET{CRLF}");
+                Err(NotEnoughParametersError { message })
+            }
+        }
+        "SET" => {
+            if let (Some(key), Some(_)) = (command_line.get(1), command_line.get(2)) {
+                Ok(Command::Set {
+                    key: key.to_string(),
+                    value: command_line[2..].concat().into(),
+                })
+            } else {
+                debug!("not enough parameters for SET command");
+                let message = format!("-ERROR not enough parameters for SET{CRLF}");
+                Err(NotEnoughParametersError { message })
+            }
         }
-    } else if command.eq(&String::from("SET")) {
-        if let (Some(key), Some(_)) = (command_line.get(1), command_line.get(2)) {
-            Ok(Command::Set {
-                key: key.to_string(),
-                value: command_line[2..].concat().into(),
-            })
-        } else {
-            debug!("not enough parameters for SET command");
-            let message = format!("-ERROR not enough parameters for SET{CRLF}");
-            Err(NotEnoughParametersError { message })
+        "QUIT" => Ok(Command::Quit),
+        "PING" => {
+            let value = command_line[1..].concat().into();
+            Ok(Command::Ping { message: value })
         }
-    } else if command.eq(&String::from("QUIT")) {
-        Ok(Command::Quit)
-    } else if command.eq(&String::from("PING")) {
-        let value = command_line[1..].concat().into();
-        Ok(Command::Ping { message: value })
-    } else {
-        Ok(Command::Unknown)
+        "FLUSHALL" => Ok(Command::FlushAll),
+        _ => Ok(Command::Unknown),
     }
 }
 
@@ -79,6 +84,17 @@ mod tests {
         assert_eq!(result.unwrap(), Command::Quit);
     }
 
+    #[test]
+    fn parse_flushall_command() {
+        let mut command_line = Vec::new();
+        command_line.push("FLUSHALL".to_string());
+
+        let result = parse_command(command_line);
+
+        assert_eq!(result.is_ok(), true);
+        assert_eq!(result.unwrap(), Command::FlushAll);
+    }
+
     #[test]
     fn parse_get_command_without_enough_arguments() {
         let mut command_line = Vec::new();
@@ -1,9 +1,10 @@
 use std::{
     collections::{hash_map::DefaultHasher, HashMap},
     hash::{Hash, Hasher},
-    io::{BufRead, BufReader, Write},
+    io::{self, BufRead, BufReader, BufWriter, Write},
     net::{TcpListener, TcpStream},
     sync::{Arc, Mutex},
+    time::Duration,
 };
 
 use bytes::Bytes;
@@ -22,6 +23,10 @@ struct Args {
     // Size of the thread pool to process requests
     #[arg(short, long, default_value_t = 8)]
     thread_pool_size: usize,
+
+    // Seconds a connection can stay idle before it's closed
+    #[arg(short, long, default_value_t = 60, value_parser = clap::value_parser!(u64).range(1..))]
+    idle_timeout: u64,
 }
 
 fn main() {
@@ -54,18 +59,33 @@ fn handle_connections(listener: TcpListener, args: &Args) {
         Err(_) => panic!("Invalid number of threads for the thread pool."),
     };
 
-    // TODO Keep connection open with client.
+    let idle_timeout = Duration::from_secs(args.idle_timeout);
+
     for stream in listener.incoming() {
         let stream = match stream {
             Ok(stream) => stream,
             Err(_) => continue,
         };
 
+        // Replies are small and sent right after each command, so they
+        // shouldn't wait for more data to be buffered.
+        if stream.set_nodelay(true).is_err() {
+            warn!("Unable to disable Nagle's algorithm for the connection");
+        }
+
+        // Each connection holds a worker of the pool while it's open,
+        // so connections that are idle or not reading their replies are
+        // closed to free it for other clients.
+        if stream.set_read_timeout(Some(idle_timeout)).is_err() {
+            warn!("Unable to set the idle timeout for the connection");
+        }
+        if stream.set_write_timeout(Some(idle_timeout)).is_err() {
+            warn!("Unable to set the write timeout for the connection");
+        }
+
         let database_clone = database.clone();
         let result = pool.execute(move || {
-            if handle_request(stream, database_clone).is_err() {
-                warn!("Error executing tcp stream");
-            };
+            handle_connection(stream, database_clone);
         });
 
         if result.is_err() {
@@ -84,30 +104,66 @@ fn create_sharded_database(num_shards: usize) -> Arc<Vec<Mutex<HashMap<String, B
 
 const CRLF: &str = "\r\n";
 
+// Replies that don't depend on the command, so they don't need to be
+// formatted on every request.
+const OK: &[u8] = b"+OK\r\n";
+const PONG: &[u8] = b"+PONG\r\n";
+const NOT_FOUND: &[u8] = b"$-1\r\n";
+const UNKNOWN_COMMAND: &[u8] = b"-ERROR unknown command\r\n";
+
 #[derive(Debug, Clone)]
 struct NoDataReceivedError;
 
-// TODO Add integration tests
-fn handle_request(
-    mut stream: TcpStream,
-    database: Arc<Vec<Mutex<HashMap<String, Bytes>>>>,
-) -> Result<(), command::NotEnoughParametersError> {
-    let buf_reader = BufReader::new(&mut stream);
-    let command_line = parse_command_line_from_stream(buf_reader);
-    // If no data is received in the command line then there's no need
-    // to return an error to the client.
-    if command_line.is_err() {
-        return Ok(());
-    }
+/// Handles every command sent through the connection until the
+/// client quits, closes the connection or stays idle, or doesn't read
+/// its replies, for longer than the idle timeout.
+fn handle_connection(stream: TcpStream, database: Arc<Vec<Mutex<HashMap<String, Bytes>>>>) {
+    let mut buf_reader = BufReader::new(&stream);
+    let mut writer = BufWriter::new(&stream);
+    // Reused for every command line read from the connection.
+    let mut line = String::new();
+
+    loop {
+        let command_line =
+            match parse_command_line_from_stream(&mut buf_reader, &mut writer, &mut line) {
+                Ok(command_line) => command_line,
+                // The client closed the connection, there's no one to
+                // send a response to.
+                Err(_) => return,
+            };
 
-    let command = command::parse_command(command_line.unwrap());
+        let mut quit = false;
+        let result = match command::parse_command(command_line) {
+            Ok(command) => {
+                quit = command == command::Command::Quit;
+                handle_request(command, &mut writer, &database)
+            }
+            Err(e) => writer.write_all(e.message.as_bytes()),
+        };
+
+        // The connection is closed right after QUIT, so its reply is
+        // flushed here instead of before the next read.
+        let result = if quit {
+            result.and_then(|_| writer.flush())
+        } else {
+            result
+        };
 
-    if let Err(e) = command {
-        stream.write_all(e.message.as_bytes()).unwrap();
-        return Err(e);
+        if result.is_err() {
+            warn!("Error executing tcp stream");
+            return;
+        }
+        if quit {
+            return;
+        }
     }
+}
 
-    let command = command.unwrap();
+fn handle_request(
+    command: command::Command,
+    stream: &mut impl Write,
+    database: &Arc<Vec<Mutex<HashMap<String, Bytes>>>>,
+) -> io::Result<()> {
     match command {
         command::Command::Get { key } => {
             let shard_key = get_shard_key(&key, database.len());
@@ -117,16 +173,11 @@ fn handle_request(
             return match shard.get(&key) {
                 Some(value) => {
                     debug!("found {:?} for {:?} on shard {:?}", value, key, shard_key);
-                    let size = value.len();
-                    let value = String::from_utf8_lossy(value);
-                    let response = format!("${size}{CRLF}+{value}{CRLF}");
-                    stream.write_all(response.as_bytes()).unwrap();
-                    Ok(())
+                    write_bulk_string(stream, value)
                 }
                 None => {
                     debug!("value not found for {:?} on shard {:?}", key, shard_key);
-                    let response = format!("$-1{CRLF}");
-                    stream.write_all(response.as_bytes()).unwrap();
+                    stream.write_all(NOT_FOUND)?;
                     Ok(())
                 }
             };
@@ -136,35 +187,44 @@ fn handle_request(
             let mut shard = database[shard_key].lock().unwrap();
             shard.insert(key, value);
             debug!("value successfully set on shard {:?}", shard_key);
-            let response = format!("+OK{CRLF}");
-            stream.write_all(response.as_bytes()).unwrap();
+            stream.write_all(OK)?;
             Ok(())
         }
         command::Command::Quit => {
-            let response = format!("+OK{CRLF}");
-            stream.write_all(response.as_bytes()).unwrap();
+            stream.write_all(OK)?;
             Ok(())
         }
         command::Command::Ping { message } => {
-            let size = message.len();
-            let response = if size == 0 {
-                format!("+PONG{CRLF}")
+            if message.is_empty() {
+                stream.write_all(PONG)
             } else {
-                let message = String::from_utf8_lossy(&message);
-                format!("${size}{CRLF}+{message}{CRLF}")
-            };
-            stream.write_all(response.as_bytes()).unwrap();
+                write_bulk_string(stream, &message)
+            }
+        }
+        command::Command::FlushAll => {
+            for shard in database.iter() {
+                shard.lock().unwrap().clear();
+            }
+            debug!("all values removed from the database");
+            stream.write_all(OK)?;
             Ok(())
         }
         command::Command::Unknown => {
             debug!("Unknown command");
-            let response = format!("-ERROR unknown command{CRLF}");
-            stream.write_all(response.as_bytes()).unwrap();
+            stream.write_all(UNKNOWN_COMMAND)?;
             Ok(())
         }
     }
 }
 
+/// Writes the value as a bulk string.
+fn write_bulk_string(stream: &mut impl Write, value: &[u8]) -> io::Result<()> {
+    let size = value.len();
+    write!(stream, "${size}{CRLF}+")?;
+    stream.write_all(value)?;
+    stream.write_all(CRLF.as_bytes())
+}
+
 /// Hashes the key to define the shard key and locate the value on the
 /// database.
 fn get_shard_key(key: &String, database_size: usize) -> usize {
@@ -175,27 +235,35 @@ fn get_shard_key(key: &String, database_size: usize) -> usize {
     hash as usize % database_size
 }
 
+/// Reads the next non-empty command line sent by the client into
+/// `line`, reusing its buffer. An error is returned once the client
+/// closes the connection or the read times out.
+///
+/// The pending replies are flushed before waiting on the client for
+/// more data, so pipelined commands that were already received are
+/// answered together.
 fn parse_command_line_from_stream(
-    buf_reader: BufReader<&mut TcpStream>,
+    buf_reader: &mut BufReader<&TcpStream>,
+    writer: &mut impl Write,
+    line: &mut String,
 ) -> Result<Vec<String>, NoDataReceivedError> {
-    let command_line = buf_reader.lines().next();
-    if command_line.is_none() {
-        return Err(NoDataReceivedError);
-    }
-    let command_line = command_line.unwrap();
-    if let Err(_e) = command_line {
-        return Err(NoDataReceivedError);
-    }
+    loop {
+        if !buf_reader.buffer().contains(&b'\n') && writer.flush().is_err() {
+            return Err(NoDataReceivedError);
+        }
 
-    let command_line = command_line.unwrap();
-    let command_line = command_line.split_whitespace();
-    let command_line: Vec<String> = command_line
-        .into_iter()
-        .map(|slice| slice.to_string())
-        .collect();
-    if command_line.get(0).is_none() {
-        return Err(NoDataReceivedError);
-    }
+        line.clear();
+        match buf_reader.read_line(line) {
+            Ok(0) | Err(_) => return Err(NoDataReceivedError),
+            Ok(_) => {}
+        }
 
-    Ok(command_line)
+        let command_line: Vec<String> = line
+            .split_whitespace()
+            .map(|slice| slice.to_string())
+            .collect();
+        if command_line.get(0).is_some() {
+            return Ok(command_line);
+        }
+    }
 }
@@ -0,0 +1,158 @@
+use std::{
+    io::{BufRead, BufReader, Read, Write},
+    net::{SocketAddr, TcpStream},
+    process::{Child, Command, Stdio},
+    sync::atomic::{AtomicU16, Ordering},
+    thread::sleep,
+    time::{Duration, Instant},
+};
+
+// Ports handed out to the tests, so each one can run its own ssache
+// instance concurrently with the others.
+static NEXT_PORT: AtomicU16 = AtomicU16::new(7780);
+
+pub const OK: &[u8] = b"+OK\r\n";
+pub const PONG: &[u8] = b"+PONG\r\n";
+pub const NOT_FOUND: &[u8] = b"$-1\r\n";
+
+/// A running ssache process started for a test. The process is killed
+/// and waited for once it goes out of scope, even if the test panics.
+pub struct Ssache {
+    process: Child,
+    pub port: u16,
+}
+
+impl Ssache {
+    /// Starts ssache with its default arguments.
+    pub fn start_with_defaults() -> Ssache {
+        Self::start(&[], 7777)
+    }
+
+    fn start(args: &[&str], port: u16) -> Ssache {
+        // The output isn't read by the tests, so it's discarded instead
+        // of being mixed with the test output. RUST_LOG isn't inherited
+        // either, so ssache doesn't spend time formatting debug logs
+        // that would be thrown away.
+        let process = match Command::new("target/debug/ssache")
+            .args(args)
+            .env_remove("RUST_LOG")
+            .stdout(Stdio::null())
+            .stderr(Stdio::null())
+            .spawn()
+        {
+            Ok(process) => process,
+            Err(_) => panic!("Unable to start ssache for testing"),
+        };
+        // Wrap the process before waiting so it's killed if ssache
+        // never gets ready.
+        let ssache = Ssache { process, port };
+        wait_for_ssache(port);
+        ssache
+    }
+}
+
+impl Drop for Ssache {
+    fn drop(&mut self) {
+        // Waiting reaps the process as soon as it exits, so it
+        // doesn't linger as a zombie until the test binary finishes.
+        if self.process.kill().is_ok() {
+            let _ = self.process.wait();
+        }
+    }
+}
+
+/// Starts ssache on a port that isn't used by any other test and
+/// waits until it's ready to accept connections.
+pub fn start_ssache() -> Ssache {
+    start_ssache_with_args(&[])
+}
+
+/// Same as [`start_ssache`], passing extra arguments to ssache.
+pub fn start_ssache_with_args(args: &[&str]) -> Ssache {
+    let port = NEXT_PORT.fetch_add(1, Ordering::SeqCst);
+    let port_arg = port.to_string();
+    let mut all_args = vec!["--port", &port_arg];
+    all_args.extend_from_slice(args);
+    Ssache::start(&all_args, port)
+}
+
+/// Waits until ssache accepts connections on the given port, instead
+/// of sleeping for a fixed amount of time.
+pub fn wait_for_ssache(port: u16) {
+    let start = Instant::now();
+    let address = SocketAddr::from(([127, 0, 0, 1], port));
+    while TcpStream::connect_timeout(&address, Duration::from_millis(50)).is_err() {
+        if start.elapsed() > Duration::from_secs(5) {
+            panic!("ssache didn't start on port {port}");
+        }
+        sleep(Duration::from_millis(10));
+    }
+}
+
+/// A connection to ssache that reads replies according to the
+/// protocol instead of by a fixed amount of bytes.
+pub struct Client {
+    reader: BufReader<TcpStream>,
+    writer: TcpStream,
+}
+
+impl Client {
+    /// Connects to ssache on the given port. Connecting and reading
+    /// replies time out, so a test fails instead of hanging if ssache
+    /// isn't running or doesn't reply.
+    pub fn connect(port: u16) -> Client {
+        let address = SocketAddr::from(([127, 0, 0, 1], port));
+        let writer = TcpStream::connect_timeout(&address, Duration::from_secs(2)).unwrap();
+        writer
+            .set_read_timeout(Some(Duration::from_secs(5)))
+            .unwrap();
+        let reader = BufReader::new(writer.try_clone().unwrap());
+        Client { reader, writer }
+    }
+
+    /// Sends a raw request, which can contain multiple commands.
+    pub fn send(&mut self, request: &[u8]) {
+        self.writer.write_all(request).unwrap();
+    }
+
+    /// Reads a single reply. Simple strings, errors and null values
+    /// are a single line, while bulk strings (`$size`) are followed by
+    /// the value line with `size` bytes.
+    pub fn read_reply(&mut self) -> Vec<u8> {
+        let mut reply = Vec::new();
+        self.reader.read_until(b'\n', &mut reply).unwrap();
+
+        if let Some(size) = reply.strip_prefix(b"$") {
+            let size: i64 = std::str::from_utf8(size)
+                .unwrap()
+                .trim_end()
+                .parse()
+                .unwrap();
+            if size >= 0 {
+                // The value is prefixed with + and ends with CRLF.
+                let start = reply.len();
+                reply.resize(start + size as usize + 3, 0);
+                self.reader.read_exact(&mut reply[start..]).unwrap();
+            }
+        }
+
+        reply
+    }
+
+    /// Sets all the values with a single pipelined request.
+    pub fn set_all(&mut self, values: &[(String, String)]) -> Vec<Vec<u8>> {
+        let request: String = values
+            .iter()
+            .map(|(key, value)| format!("SET {key} {value}\r\n"))
+            .collect();
+        self.send(request.as_bytes());
+        values.iter().map(|_| self.read_reply()).collect()
+    }
+
+    /// Gets all the keys with a single pipelined request.
+    pub fn get_all(&mut self, keys: &[String]) -> Vec<Vec<u8>> {
+        let request: String = keys.iter().map(|key| format!("GET {key}\r\n")).collect();
+        self.send(request.as_bytes());
+        keys.iter().map(|_| self.read_reply()).collect()
+    }
+}
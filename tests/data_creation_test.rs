@@ -1,16 +1,156 @@
-use std::{net::TcpStream, process::Command, thread::sleep, time::Duration};
+use std::{io::Write, net::TcpStream, time::Duration};
+
+mod common;
+
+#[test]
+fn replies_to_ping_on_the_default_port() {
+    let ssache = common::Ssache::start_with_defaults();
+
+    let mut client = common::Client::connect(ssache.port);
+
+    client.send(b"PING\r\n");
+    assert_eq!(client.read_reply(), common::PONG);
+}
+
+#[test]
+fn sends_multiple_commands_on_the_same_connection() {
+    let ssache = common::start_ssache();
+
+    let mut client = common::Client::connect(ssache.port);
+
+    client.send(b"SET key value\r\n");
+    assert_eq!(client.read_reply(), common::OK);
+
+    client.send(b"GET key\r\n");
+    assert_eq!(client.read_reply(), b"$5\r\n+value\r\n");
+
+    client.send(b"QUIT\r\n");
+    assert_eq!(client.read_reply(), common::OK);
+}
+
+#[test]
+fn sends_pipelined_commands_on_the_same_connection() {
+    let ssache = common::start_ssache();
+
+    let mut client = common::Client::connect(ssache.port);
+
+    let values: Vec<(String, String)> = (0..25)
+        .map(|i| (format!("key-{i}"), format!("value-{i:02}")))
+        .collect();
+    assert_eq!(client.set_all(&values), vec![common::OK; 25]);
+
+    let keys: Vec<String> = (0..25).map(|i| format!("key-{i}")).collect();
+    let expected_replies: Vec<Vec<u8>> = (0..25)
+        .map(|i| format!("$8\r\n+value-{i:02}\r\n").into_bytes())
+        .collect();
+    assert_eq!(client.get_all(&keys), expected_replies);
+}
+
+#[test]
+fn replies_to_commands_without_data() {
+    let ssache = common::start_ssache();
+
+    let mut client = common::Client::connect(ssache.port);
+
+    client.send(b"PING\r\n");
+    assert_eq!(client.read_reply(), common::PONG);
+
+    client.send(b"GET key\r\n");
+    assert_eq!(client.read_reply(), common::NOT_FOUND);
+
+    client.send(b"UNKNOWN\r\n");
+    assert_eq!(client.read_reply(), b"-ERROR unknown command\r\n");
+}
+
+#[test]
+fn replies_to_ping_with_the_message() {
+    let ssache = common::start_ssache();
+
+    let mut client = common::Client::connect(ssache.port);
+
+    client.send(b"PING message\r\n");
+    assert_eq!(client.read_reply(), b"$7\r\n+message\r\n");
+}
+
+#[test]
+fn removes_all_values_with_flushall() {
+    let ssache = common::start_ssache();
+
+    let mut client = common::Client::connect(ssache.port);
+
+    let values: Vec<(String, String)> = (0..4)
+        .map(|i| (format!("key-{i}"), "value".to_string()))
+        .collect();
+    assert_eq!(client.set_all(&values), vec![common::OK; 4]);
+
+    client.send(b"FLUSHALL\r\n");
+    assert_eq!(client.read_reply(), common::OK);
+
+    let keys: Vec<String> = values.into_iter().map(|(key, _)| key).collect();
+    assert_eq!(client.get_all(&keys), vec![common::NOT_FOUND; 4]);
+}
 
 #[test]
-fn checks_if_connection_is_successful() {
-    let mut cmd = match Command::new("target/debug/ssache").spawn() {
-        Ok(cmd) => cmd,
-        Err(_) => panic!("Unable to start ssache for testing"),
-    };
+fn serves_more_connections_than_threads_in_the_pool() {
+    let thread_pool_size = 2;
+    let ssache = common::start_ssache_with_args(&[
+        "--thread-pool-size",
+        &thread_pool_size.to_string(),
+        "--idle-timeout",
+        "1",
+    ]);
+
+    let mut clients: Vec<common::Client> = (0..thread_pool_size + 1)
+        .map(|_| common::Client::connect(ssache.port))
+        .collect();
+
+    // Every request is sent before any reply is read, so the last
+    // connection only gets its reply once an idle connection is
+    // closed and frees its worker.
+    for (i, client) in clients.iter_mut().enumerate() {
+        client.send(format!("SET key-{i} value-{i:02}\r\nGET key-{i}\r\n").as_bytes());
+    }
+    for (i, client) in clients.iter_mut().enumerate() {
+        assert_eq!(client.read_reply(), common::OK);
+        let expected_reply = format!("$8\r\n+value-{i:02}\r\n");
+        assert_eq!(client.read_reply(), expected_reply.as_bytes());
+    }
+}
+
+#[test]
+fn replies_to_a_command_followed_by_a_blank_line() {
+    let ssache = common::start_ssache();
+
+    let mut client = common::Client::connect(ssache.port);
+
+    client.send(b"PING\r\n\r\n");
+    assert_eq!(client.read_reply(), common::PONG);
+
+    client.send(b"GET key\r\n  \r\n");
+    assert_eq!(client.read_reply(), common::NOT_FOUND);
+}
+
+#[test]
+fn closes_connections_that_dont_read_their_replies() {
+    let ssache =
+        common::start_ssache_with_args(&["--thread-pool-size", "1", "--idle-timeout", "1"]);
+
+    let mut client = common::Client::connect(ssache.port);
+    client.send(format!("SET key {}\r\n", "v".repeat(4000)).as_bytes());
+    assert_eq!(client.read_reply(), common::OK);
+    drop(client);
 
-    sleep(Duration::from_secs(1));
+    // Pipelines GETs for a large value without ever reading the
+    // replies, so the only worker blocks writing to this connection.
+    let stream = TcpStream::connect(("127.0.0.1", ssache.port)).unwrap();
+    stream
+        .set_write_timeout(Some(Duration::from_secs(1)))
+        .unwrap();
+    let _ = (&stream).write_all("GET key\r\n".repeat(500_000).as_bytes());
 
-    let stream = TcpStream::connect("127.0.0.1:7777");
-    assert_eq!(stream.is_ok(), true);
+    let mut client = common::Client::connect(ssache.port);
+    client.send(b"PING\r\n");
+    assert_eq!(client.read_reply(), common::PONG);
 
-    cmd.kill().unwrap();
+    drop(stream);
 }